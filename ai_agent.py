@@ -2,21 +2,73 @@
 AI Agent Module: Handle natural language understanding and command generation
 """
 import os
-import json
-from typing import Optional, Dict, List, Tuple
-import requests
+import gzip
+import asyncio
+import itertools
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Callable, Deque, Dict, List, Tuple, Union
+import orjson
 from config import (
     AI_MODEL, 
     AI_API_KEY, 
-    AI_API_URL, 
+    AI_API_KEYS,
+    AI_API_URLS,
     AI_API_PROVIDER,
     API_TIMEOUT,
+    SUPPORTS_GZIP,
+    GZIP_MIN_SIZE,
+    STREAM_RESPONSES,
+    PREWARM_CONNECTION,
+    BATCH_CONCURRENCY,
+    HISTORY_WINDOW_MAX,
+    HISTORY_WINDOW_MIN,
+    HISTORY_TOKEN_BUDGET,
+    CACHE_ENABLED,
+    SEMANTIC_CACHE_ENABLED,
     DEBUG_MODE
 )
 from rich.console import Console
+from cache import LLMCache, SemanticCache
+from intent_router import route
+
+# HTTP clients and tokenizer are imported on first use to keep startup fast
+if TYPE_CHECKING:
+    import httpx
+    import requests
 
 console = Console()
 
+# Marker the AI puts before commands that need user approval
+NEEDS_APPROVAL_PREFIX = "NEEDS_APPROVAL:"
+NEEDS_APPROVAL_PREFIX_LEN = len(NEEDS_APPROVAL_PREFIX)
+
+
+# tiktoken downloads its encoding file on first use (no timeout), so it is loaded
+# in a background thread and token counts fall back to an estimate until it is ready
+_encoding = None
+_encoding_loader: Optional[threading.Thread] = None
+
+
+def _load_encoding():
+    """Load tiktoken encoding, leave it None if tiktoken or its encoding file is unavailable"""
+    global _encoding
+    try:
+        import tiktoken
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        pass
+
+
+def _get_encoding():
+    """Return tiktoken encoding if already loaded, else start loading it and return None (never blocks)"""
+    global _encoding_loader
+    if _encoding_loader is None:
+        _encoding_loader = threading.Thread(target=_load_encoding, daemon=True)
+        _encoding_loader.start()
+    return _encoding
+
 
 class AIAgent:
     """AI Agent, responsible for understanding natural language and generating commands"""
@@ -31,7 +83,36 @@ class AIAgent:
         else:
             self.api_configured = True
         
-        self.conversation_history: List[Dict[str, str]] = []
+        self.conversation_history: Deque[Dict[str, str]] = deque()
+        # Only exact counts are memoized, estimates made before the encoding loads are not
+        self._count_tokens_exact = lru_cache(maxsize=256)(self._count_tokens_uncached)
+        _get_encoding()  # Start loading the tokenizer before the first request
+        
+        # (URL, key) pairs used round-robin, to spread load past per-key rate limits
+        endpoint_count = max(len(AI_API_URLS), len(AI_API_KEYS), 1)
+        self._endpoints: List[Tuple[str, str]] = [
+            (AI_API_URLS[i % len(AI_API_URLS)], AI_API_KEYS[i % len(AI_API_KEYS)] if AI_API_KEYS else "")
+            for i in range(endpoint_count)
+        ]
+        self._endpoint_cycle = itertools.cycle(range(endpoint_count))
+        # Concurrency is bounded per endpoint, not globally
+        self._endpoint_semaphores = [asyncio.Semaphore(BATCH_CONCURRENCY) for _ in self._endpoints]
+        
+        self.cache: Optional[LLMCache] = LLMCache() if CACHE_ENABLED else None
+        self.semantic_cache: Optional[SemanticCache] = None
+        if SEMANTIC_CACHE_ENABLED:
+            try:
+                self.semantic_cache = SemanticCache()
+            except ImportError:
+                console.print(
+                    "[yellow]Warning: semantic cache requires sentence-transformers and faiss-cpu, "
+                    "continuing without it.[/yellow]"
+                )
+        
+        # HTTP clients, created on first request
+        self._session: Optional["requests.Session"] = None
+        self._aclient: Optional["httpx.AsyncClient"] = None
+        
         self.system_prompt = """You are a command-line AI assistant. Your task is to understand user's natural language requests and convert them into appropriate Linux/Unix commands.
 
 Rules:
@@ -66,27 +147,107 @@ You: NEEDS_APPROVAL: find . -name "*.log" -type f -delete
 User: "Delete file using sudo"
 You: NEEDS_APPROVAL: sudo rm file.txt
 """
+        # System message built once and never mutated (no timestamps or per-user content),
+        # so its bytes are identical on every request and providers can reuse its prefill
+        if AI_API_PROVIDER == 'anthropic':
+            # Anthropic needs an explicit cache breakpoint
+            self._system_msg = {
+                "role": "system",
+                "content": [{
+                    "type": "text",
+                    "text": self.system_prompt,
+                    "cache_control": {"type": "ephemeral"}
+                }]
+            }
+        else:
+            # OpenAI-compatible providers cache identical prefixes automatically
+            self._system_msg = {"role": "system", "content": self.system_prompt}
+    
+    def _get_session(self) -> "requests.Session":
+        """Get pooled session, reused so the TCP/TLS connection is kept alive across turns"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=16,
+                max_retries=Retry(
+                    total=2,
+                    connect=2,
+                    read=0,  # Never resend a request the server may already be generating
+                    backoff_factor=0.2,
+                    status_forcelist=[502, 503, 504],
+                    allowed_methods=None,  # Also retry POST on gateway errors
+                    raise_on_status=False
+                )
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+    
+    def _get_async_client(self) -> "httpx.AsyncClient":
+        """Get shared async client (HTTP/2 multiplexing) for achat()"""
+        if self._aclient is None:
+            import httpx
+            self._aclient = httpx.AsyncClient(
+                http2=True,
+                timeout=API_TIMEOUT,
+                limits=httpx.Limits(max_keepalive_connections=16)
+            )
+        return self._aclient
+    
+    async def aprewarm(self):
+        """
+        Open connections to the API endpoints in the background (cheap HEAD request),
+        so the first achat() reuses an established TLS/HTTP2 connection
+        """
+        if not self.api_configured or not PREWARM_CONNECTION:
+            return
+        client = self._get_async_client()
+        
+        async def head(url: str):
+            try:
+                await client.head(url, timeout=5)
+            except Exception:
+                pass  # Best effort only, the real request reports errors
+        
+        await asyncio.gather(*(head(url) for url in {url for url, _ in self._endpoints}))
+    
+    @property
+    def endpoint_count(self) -> int:
+        """Number of configured API endpoints"""
+        return len(self._endpoints)
+    
+    def _next_endpoint(self) -> int:
+        """Pick next endpoint index (round-robin)"""
+        return next(self._endpoint_cycle)
     
-    def _build_headers(self) -> Dict[str, str]:
+    def _build_headers(self, api_key: str) -> Dict[str, str]:
         """Build API request headers"""
         headers = {
             "Content-Type": "application/json",
+            "Connection": "keep-alive",
+            "Accept-Encoding": "gzip, deflate",
         }
         
         # Set authentication header according to API provider
         if AI_API_PROVIDER == 'openai':
-            headers["Authorization"] = f"Bearer {AI_API_KEY}"
+            headers["Authorization"] = f"Bearer {api_key}"
         else:
             # Custom API, can support multiple authentication methods
             # If API requires Bearer token
-            if AI_API_KEY:
-                headers["Authorization"] = f"Bearer {AI_API_KEY}"
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
             # Or use API-Key header
-            # headers["X-API-Key"] = AI_API_KEY
+            # headers["X-API-Key"] = api_key
         
         return headers
     
-    def _build_request_payload(self, messages: List[Dict[str, str]]) -> Dict:
+    def _build_request_payload(self, messages: List[Dict[str, str]], stream: bool = False) -> Dict:
         """Build API request payload"""
         payload = {
             "model": AI_MODEL,
@@ -94,13 +255,26 @@ You: NEEDS_APPROVAL: sudo rm file.txt
             "temperature": 0.3,
             "max_tokens": 500
         }
+        if stream:
+            payload["stream"] = True
         return payload
     
-    def _parse_response(self, response: requests.Response) -> str:
-        """Parse API response"""
+    def _build_body(self, payload: Dict, headers: Dict[str, str]) -> bytes:
+        """Serialize payload, gzip-compressing large bodies when the API supports it"""
+        body = orjson.dumps(payload)
+        if SUPPORTS_GZIP and len(body) > GZIP_MIN_SIZE:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+        return body
+    
+    def _parse_response(self, response: Union["requests.Response", "httpx.Response"]) -> str:
+        """Parse API response (requests or httpx)"""
         try:
-            response.raise_for_status()
-            data = response.json()
+            if response.status_code >= 400:
+                error_msg = f"API HTTP Error: {response.status_code} - {response.text}"
+                console.print(f"[red]{error_msg}[/red]")
+                return f"Error: {error_msg}"
+            data = orjson.loads(response.content)
             
             # Support OpenAI-compatible format
             if "choices" in data and len(data["choices"]) > 0:
@@ -120,13 +294,9 @@ You: NEEDS_APPROVAL: sudo rm file.txt
             
             # If none match, return the entire response (for debugging)
             console.print(f"[yellow]Warning: Unable to parse API response format[/yellow]")
-            return json.dumps(data, ensure_ascii=False, indent=2)
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
             
-        except requests.exceptions.HTTPError as e:
-            error_msg = f"API HTTP Error: {e.response.status_code} - {e.response.text}"
-            console.print(f"[red]{error_msg}[/red]")
-            return f"Error: {error_msg}"
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             error_msg = f"API response parsing error: {str(e)}"
             console.print(f"[red]{error_msg}[/red]")
             return f"Error: {error_msg}"
@@ -135,85 +305,321 @@ You: NEEDS_APPROVAL: sudo rm file.txt
             console.print(f"[red]{error_msg}[/red]")
             return f"Error: {error_msg}"
     
-    def chat(self, user_input: str) -> Tuple[str, bool]:
+    @staticmethod
+    def _is_event_stream(response: Union["requests.Response", "httpx.Response"]) -> bool:
+        """Check if the API answered with a successful server-sent event stream"""
+        content_type = response.headers.get("Content-Type", "")
+        return response.status_code < 400 and content_type.startswith("text/event-stream")
+    
+    def _parse_stream_line(self, line: Union[str, bytes]) -> str:
+        """Extract the text delta from one server-sent event line (OpenAI-compatible format)"""
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.startswith("data:"):
+            return ""
+        data = line[len("data:"):].strip()
+        if not data or data == "[DONE]":
+            return ""
+        choices = orjson.loads(data).get("choices")
+        if not choices:
+            return ""
+        return choices[0].get("delta", {}).get("content") or ""
+    
+    def _add_user_message(self, user_input: str):
+        """Add user input to history"""
+        # Add user message to history
+        self.conversation_history.append({
+            "role": "user",
+            "content": user_input
+        })
+        
+        # Roll the window in one step instead of every turn, keeping the prefix stable
+        if len(self.conversation_history) > HISTORY_WINDOW_MAX:
+            for _ in range(len(self.conversation_history) - HISTORY_WINDOW_MIN):
+                self.conversation_history.popleft()
+            # Always start the window with a user message
+            while self.conversation_history[0]["role"] != "user":
+                self.conversation_history.popleft()
+    
+    def _count_tokens(self, text: str) -> int:
+        """Count tokens of text"""
+        if _get_encoding() is None:
+            return len(text) // 4 + 1  # Rough estimate, ~4 characters per token
+        return self._count_tokens_exact(text)
+    
+    def _count_tokens_uncached(self, text: str) -> int:
+        """Count tokens of text with the loaded tiktoken encoding"""
+        return len(_encoding.encode(text))
+    
+    def _trim_by_tokens(self, history: Deque[Dict[str, str]], budget: int = HISTORY_TOKEN_BUDGET) -> List[Dict[str, str]]:
+        """
+        Keep the newest messages that fit in the token budget
+        
+        Args:
+            history: Conversation history, oldest first
+            budget: Maximum total tokens of kept messages
+            
+        Returns:
+            Kept messages, oldest first (the latest message is always kept)
+        """
+        kept = []
+        total = 0
+        for message in reversed(history):
+            total += self._count_tokens(message["content"])
+            if kept and total > budget:
+                break
+            kept.append(message)
+        # Do not start with a dangling assistant reply
+        while len(kept) > 1 and kept[-1]["role"] != "user":
+            kept.pop()
+        kept.reverse()
+        return kept
+    
+    def _build_messages(self, user_input: str, use_history: bool = True) -> List[Dict[str, str]]:
+        """Add user input to history and build the message list to send"""
+        if not use_history:
+            return [self._system_msg, {"role": "user", "content": user_input}]
+        self._add_user_message(user_input)
+        return [self._system_msg, *self._trim_by_tokens(self.conversation_history)]
+    
+    def _finish_response(self, ai_response: str, use_history: bool = True) -> Tuple[str, bool]:
+        """Detect approval marker and record AI reply in history"""
+        # Check if approval is needed
+        needs_approval = False
+        if ai_response.startswith(NEEDS_APPROVAL_PREFIX):
+            needs_approval = True
+            ai_response = ai_response[NEEDS_APPROVAL_PREFIX_LEN:].lstrip()
+        
+        # Add AI reply to history (save original response)
+        if use_history:
+            self.conversation_history.append({
+                "role": "assistant",
+                "content": ai_response
+            })
+        
+        return ai_response, needs_approval
+    
+    def _is_standalone(self, use_history: bool = True) -> bool:
+        """Check if the current request has no prior conversation (first turn or history not used)"""
+        return not use_history or len(self.conversation_history) == 1
+    
+    def _cache_lookup(self, payload: Dict, user_input: str, standalone: bool) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Look up exact then semantic cache, return (cache key, cached response)
+        
+        The semantic cache keys on the user input alone, so it is only used for standalone
+        requests; follow-ups like "delete it" depend on the conversation.
+        """
+        key, cached = None, None
+        if self.cache is not None:
+            key = LLMCache.make_key(payload)
+            cached = self.cache.get(key)
+        if cached is None and standalone and self.semantic_cache is not None:
+            cached = self.semantic_cache.get(user_input)
+        return key, cached
+    
+    def _cache_store(self, key: Optional[str], user_input: str, ai_response: str, standalone: bool):
+        """Store successful response in caches"""
+        if ai_response.startswith("Error:"):
+            return
+        if key is not None:
+            self.cache.set(key, ai_response)
+        if standalone and self.semantic_cache is not None:
+            self.semantic_cache.set(user_input, ai_response)
+    
+    def _print_request(self, url: str, payload: Dict):
+        """Print request details (debug mode)"""
+        # System prompt count is memoized, only history is counted per request
+        system_tokens = self._count_tokens(self.system_prompt)
+        history_tokens = sum(self._count_tokens(m["content"]) for m in payload["messages"][1:])
+        console.print(f"[dim]Sending request to: {url}[/dim]")
+        console.print(f"[dim]Prompt tokens: system {system_tokens} + history {history_tokens}[/dim]")
+        console.print(f"[dim]Request body: {orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode('utf-8')}[/dim]")
+    
+    def _handle_error(self, error_msg: str) -> Tuple[str, bool]:
+        """Report request error"""
+        console.print(f"[red]{error_msg}[/red]")
+        if DEBUG_MODE:
+            import traceback
+            console.print(traceback.format_exc())
+        return (f"Error: {error_msg}", False)
+    
+    def chat(self, user_input: str, on_chunk: Optional[Callable[[str], None]] = None) -> Tuple[str, bool]:
         """
         Process user input, return AI-generated command or answer, and whether approval is needed
         
         Args:
             user_input: User's natural language input
+            on_chunk: Optional callback, receives response text as it is streamed
             
         Returns:
             Tuple of (command/answer, whether approval is needed)
         """
+        import requests
+        
+        # Well-known trivial requests are answered locally
+        local_command = route(user_input)
+        if local_command is not None:
+            self._add_user_message(user_input)
+            return self._finish_response(local_command)
+        
         if not self.api_configured:
             return ("Error: AI service not configured. Please set AI_API_KEY environment variable.", False)
         
-        # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_input
-        })
-        
         try:
-            # Build message list
-            messages = [
-                {"role": "system", "content": self.system_prompt}
-            ] + self.conversation_history[-10:]  # Keep only the last 10 messages to save tokens
-            
             # Build request
-            headers = self._build_headers()
-            payload = self._build_request_payload(messages)
+            messages = self._build_messages(user_input)
+            standalone = self._is_standalone()
+            url, api_key = self._endpoints[self._next_endpoint()]
+            headers = self._build_headers(api_key)
+            stream = STREAM_RESPONSES and on_chunk is not None
+            payload = self._build_request_payload(messages, stream)
+            
+            # Reuse previous answer for an identical request
+            cache_key, cached = self._cache_lookup(payload, user_input, standalone)
+            if cached is not None:
+                if DEBUG_MODE:
+                    console.print("[dim]Response served from cache[/dim]")
+                return self._finish_response(cached)
             
             # Send HTTP request
             if DEBUG_MODE:
-                console.print(f"[dim]Sending request to: {AI_API_URL}[/dim]")
-                console.print(f"[dim]Request body: {json.dumps(payload, ensure_ascii=False, indent=2)}[/dim]")
+                self._print_request(url, payload)
             
-            response = requests.post(
-                AI_API_URL,
+            response = self._get_session().post(
+                url,
                 headers=headers,
-                json=payload,
-                timeout=API_TIMEOUT
+                data=self._build_body(payload, headers),
+                timeout=API_TIMEOUT,
+                stream=stream
             )
             
             # Parse response
-            ai_response = self._parse_response(response)
-            
-            # Check if approval is needed
-            needs_approval = False
-            if ai_response.startswith("NEEDS_APPROVAL:"):
-                needs_approval = True
-                ai_response = ai_response.replace("NEEDS_APPROVAL:", "").strip()
-            
-            # Add AI reply to history (save original response)
-            self.conversation_history.append({
-                "role": "assistant",
-                "content": ai_response
-            })
-            
-            return ai_response, needs_approval
+            if stream and self._is_event_stream(response):
+                parts = []
+                for line in response.iter_lines():
+                    delta = self._parse_stream_line(line)
+                    if delta:
+                        parts.append(delta)
+                        on_chunk(delta)
+                ai_response = "".join(parts).strip()
+            else:
+                ai_response = self._parse_response(response)
+            self._cache_store(cache_key, user_input, ai_response, standalone)
+            return self._finish_response(ai_response)
             
         except requests.exceptions.Timeout:
-            error_msg = f"API request timeout (exceeded {API_TIMEOUT} seconds)"
-            console.print(f"[red]{error_msg}[/red]")
-            return (f"Error: {error_msg}", False)
+            return self._handle_error(f"API request timeout (exceeded {API_TIMEOUT} seconds)")
         except requests.exceptions.ConnectionError:
-            error_msg = "Unable to connect to API server, please check network connection and API_URL configuration"
-            console.print(f"[red]{error_msg}[/red]")
-            return (f"Error: {error_msg}", False)
+            return self._handle_error("Unable to connect to API server, please check network connection and API_URL configuration")
         except Exception as e:
-            error_msg = f"AI service error: {str(e)}"
-            console.print(f"[red]{error_msg}[/red]")
+            return self._handle_error(f"AI service error: {str(e)}")
+    
+    async def _asend(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict,
+        stream: bool,
+        on_chunk: Optional[Callable[[str], None]]
+    ) -> str:
+        """Send request with the async client and return the response text"""
+        client = self._get_async_client()
+        request = client.build_request(
+            "POST",
+            url,
+            headers=headers,
+            content=self._build_body(payload, headers)
+        )
+        response = await client.send(request, stream=stream)
+        
+        # Parse response
+        try:
+            if stream and self._is_event_stream(response):
+                parts = []
+                async for line in response.aiter_lines():
+                    delta = self._parse_stream_line(line)
+                    if delta:
+                        parts.append(delta)
+                        on_chunk(delta)
+                return "".join(parts).strip()
+            await response.aread()
+            return self._parse_response(response)
+        finally:
+            await response.aclose()
+    
+    async def achat(
+        self,
+        user_input: str,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        use_history: bool = True
+    ) -> Tuple[str, bool]:
+        """
+        Async version of chat(), lets the caller overlap the API call with other work
+        
+        Args:
+            user_input: User's natural language input
+            on_chunk: Optional callback, receives response text as it is streamed
+            use_history: Whether to send and record conversation history
+                (False for independent requests issued concurrently)
+            
+        Returns:
+            Tuple of (command/answer, whether approval is needed)
+        """
+        import httpx
+        
+        # Well-known trivial requests are answered locally
+        local_command = route(user_input)
+        if local_command is not None:
+            if use_history:
+                self._add_user_message(user_input)
+            return self._finish_response(local_command, use_history)
+        
+        if not self.api_configured:
+            return ("Error: AI service not configured. Please set AI_API_KEY environment variable.", False)
+        
+        try:
+            # Build request
+            messages = self._build_messages(user_input, use_history)
+            standalone = self._is_standalone(use_history)
+            index = self._next_endpoint()
+            url, api_key = self._endpoints[index]
+            headers = self._build_headers(api_key)
+            stream = STREAM_RESPONSES and on_chunk is not None
+            payload = self._build_request_payload(messages, stream)
+            
+            # Reuse previous answer for an identical request
+            cache_key, cached = self._cache_lookup(payload, user_input, standalone)
+            if cached is not None:
+                if DEBUG_MODE:
+                    console.print("[dim]Response served from cache[/dim]")
+                return self._finish_response(cached, use_history)
+            
+            # Send HTTP request
             if DEBUG_MODE:
-                import traceback
-                console.print(traceback.format_exc())
-            return (f"Error: {error_msg}", False)
+                self._print_request(url, payload)
+            
+            async with self._endpoint_semaphores[index]:
+                ai_response = await self._asend(url, headers, payload, stream, on_chunk)
+            self._cache_store(cache_key, user_input, ai_response, standalone)
+            return self._finish_response(ai_response, use_history)
+            
+        except httpx.TimeoutException:
+            return self._handle_error(f"API request timeout (exceeded {API_TIMEOUT} seconds)")
+        except httpx.ConnectError:
+            return self._handle_error("Unable to connect to API server, please check network connection and API_URL configuration")
+        except Exception as e:
+            return self._handle_error(f"AI service error: {str(e)}")
+    
+    async def aclose(self):
+        """Close the async HTTP client"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
     
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
     
     def get_history(self) -> List[Dict[str, str]]:
         """Get conversation history"""
-        return self.conversation_history.copy()
-
+        return list(self.conversation_history)
@@ -0,0 +1,112 @@
+"""
+Cache Module: Reuse AI responses for repeated requests
+"""
+import os
+import re
+import hashlib
+from typing import Dict, List, Optional, Tuple
+import orjson
+from config import (
+    CACHE_DIR,
+    CACHE_TTL,
+    CACHE_SIZE_LIMIT,
+    SEMANTIC_CACHE_MODEL,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_EXCLUDE_PATTERNS
+)
+
+
+class LLMCache:
+    """Exact-match response cache, persisted on disk with LRU eviction"""
+    
+    def __init__(self, directory: str = CACHE_DIR, ttl: int = CACHE_TTL, size_limit: int = CACHE_SIZE_LIMIT):
+        import diskcache
+        
+        self._cache = diskcache.Cache(
+            os.path.expanduser(directory),
+            size_limit=size_limit,
+            eviction_policy="least-recently-used"
+        )
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+    
+    @staticmethod
+    def make_key(payload: Dict) -> str:
+        """Build cache key from the fields that determine the response"""
+        key_data = {
+            "model": payload["model"],
+            "messages": payload["messages"],
+            "temperature": payload["temperature"],
+        }
+        raw = orjson.dumps(key_data, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(raw).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get cached response, None on miss"""
+        value = self._cache.get(key)
+        if value is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return value
+    
+    def set(self, key: str, value: str):
+        """Store response"""
+        self._cache.set(key, value, expire=self.ttl)
+    
+    def clear(self):
+        """Remove all cached responses"""
+        self._cache.clear()
+
+
+class SemanticCache:
+    """
+    In-memory similarity cache for paraphrased requests
+    
+    Requests are embedded with a sentence-transformers model and searched by
+    cosine similarity (inner product of normalized vectors) in a faiss index.
+    """
+    
+    def __init__(self, model_name: str = SEMANTIC_CACHE_MODEL, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        # Optional dependencies, ImportError is handled by the caller
+        from sentence_transformers import SentenceTransformer
+        import faiss
+        
+        self._model = SentenceTransformer(model_name)
+        self._index = faiss.IndexFlatIP(self._model.get_sentence_embedding_dimension())
+        self._responses: List[str] = []
+        self._exclude = [re.compile(p) for p in SEMANTIC_CACHE_EXCLUDE_PATTERNS]
+        self._last: Optional[Tuple[str, object]] = None
+        self.threshold = threshold
+        self.stats = {"hits": 0, "misses": 0}
+    
+    def _embed(self, prompt: str):
+        """Embed prompt as a normalized float32 row vector, reusing the last result"""
+        if self._last is None or self._last[0] != prompt:
+            vec = self._model.encode([prompt], normalize_embeddings=True).astype("float32")
+            self._last = (prompt, vec)
+        return self._last[1]
+    
+    def is_cacheable(self, prompt: str) -> bool:
+        """Check if prompt is safe to answer from cache (not time dependent)"""
+        prompt_lower = prompt.lower()
+        return not any(pattern.search(prompt_lower) for pattern in self._exclude)
+    
+    def get(self, prompt: str) -> Optional[str]:
+        """Get response of the most similar cached prompt, None if below threshold"""
+        if not self.is_cacheable(prompt):
+            return None
+        if self._index.ntotal > 0:
+            scores, ids = self._index.search(self._embed(prompt), 1)
+            if scores[0][0] >= self.threshold:
+                self.stats["hits"] += 1
+                return self._responses[ids[0][0]]
+        self.stats["misses"] += 1
+        return None
+    
+    def set(self, prompt: str, value: str):
+        """Store response for prompt"""
+        if not self.is_cacheable(prompt):
+            return
+        self._index.add(self._embed(prompt))
+        self._responses.append(value)
@@ -1,16 +1,99 @@
 """
 Command Executor Module: Handle command display, sensitive command approval and execution
 """
-import subprocess
+import os
 import re
-from typing import Optional, Tuple
+import sys
+import signal
+import time
+import shutil
+import subprocess
+import shlex
+import threading
+from collections import deque
+from typing import IO, Deque, List, Optional, TextIO, Tuple
 from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Confirm
-from config import SENSITIVE_COMMAND_KEYWORDS, DANGEROUS_PATTERNS, COMMAND_TIMEOUT
+from config import (
+    SENSITIVE_COMMAND_WORDS,
+    SENSITIVE_COMMAND_PHRASES,
+    SENSITIVE_COMMAND_PREFIXES,
+    REDIRECTION_OPERATOR_REGEX,
+    DANGEROUS_REGEX,
+    COMMAND_TIMEOUT,
+    OUTPUT_TAIL_LIMIT
+)
 
 console = Console()
 
+# Characters that need shell interpretation (pipes, redirection, expansion, globbing ...)
+SHELL_METACHARACTERS = re.compile(r'[|&;<>`$(){}*?\[\]~!#\n]')
+
+# Shell builtins and keywords (POSIX special and regular builtins plus common
+# bash ones), not found on PATH but valid as a command head
+SHELL_BUILTINS = {
+    # Special builtins
+    '.', ':', 'break', 'continue', 'eval', 'exec', 'exit', 'export', 'readonly',
+    'return', 'set', 'shift', 'times', 'trap', 'unset',
+    # Regular builtins
+    'alias', 'bg', 'cd', 'command', 'false', 'fc', 'fg', 'getopts', 'hash', 'jobs',
+    'kill', 'newgrp', 'pwd', 'read', 'true', 'type', 'ulimit', 'umask', 'unalias', 'wait',
+    'echo', 'printf', 'test', '[',
+    # Bash builtins
+    'source', 'let', 'local', 'declare', 'typeset', 'builtin', 'enable', 'help',
+    'history', 'disown', 'suspend', 'shopt', 'pushd', 'popd', 'dirs', 'mapfile',
+    'readarray', 'caller', 'compgen', 'complete', 'logout',
+    # Keywords
+    'for', 'if', 'while', 'until', 'case', 'function', 'select', 'time', '[[', '!', '{',
+}
+
+def tokenize_command(command: str) -> List[str]:
+    """
+    Split command into shell tokens, with operators (|, &&, ;, >, >> ...) as separate tokens
+    
+    Args:
+        command: Command string to split
+        
+    Returns:
+        List of tokens
+    """
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        return list(lexer)
+    except ValueError:
+        # Unbalanced quotes, fall back to plain whitespace split
+        return command.split()
+
+
+# Tokens that may hold a nested command: quoted scripts ('bash -c "rm x"'),
+# backtick or $(...) command substitution
+NESTED_COMMAND = re.compile(r'[\s;|&<>()`]')
+COMMAND_SUBSTITUTION = re.compile(r'`|\$\(')
+
+
+def expand_command_tokens(command: str, depth: int = 0) -> List[str]:
+    """
+    Tokenize command, also including the tokens of commands nested in quoted
+    arguments and command substitutions
+    
+    Args:
+        command: Command string to split
+        depth: Current nesting level (recursion is bounded)
+        
+    Returns:
+        List of tokens, outer command first
+    """
+    tokens = tokenize_command(command)
+    if depth >= 4:
+        return tokens
+    expanded = list(tokens)
+    for token in tokens:
+        if NESTED_COMMAND.search(token):
+            expanded.extend(expand_command_tokens(COMMAND_SUBSTITUTION.sub(' ', token), depth + 1))
+    return expanded
+
 
 class CommandExecutor:
     """Command executor, responsible for displaying commands, checking sensitivity and executing commands"""
@@ -30,15 +113,34 @@ class CommandExecutor:
         """
         command_lower = command.lower().strip()
         
-        # Check if contains sensitive keywords
-        for keyword in SENSITIVE_COMMAND_KEYWORDS:
-            if keyword in command_lower:
+        # Nested commands (sh -c '...', eval "...", `...`, $(...)) are checked too
+        tokens = expand_command_tokens(command_lower)
+        
+        # Check if any command word, option or operator is a sensitive keyword
+        # ('/bin/rm' -> 'rm', '-delete' -> 'delete', 'os.remove' -> 'remove')
+        words = set()
+        for token in tokens:
+            word = token.rsplit('/', 1)[-1].lstrip('-') or token
+            words.add(word)
+            words.add(word.rsplit('.', 1)[-1])
+        if words & SENSITIVE_COMMAND_WORDS:
+            return True
+        if any(word.startswith(SENSITIVE_COMMAND_PREFIXES) for word in words):
+            return True
+        
+        # Any output redirection may overwrite files
+        if any(REDIRECTION_OPERATOR_REGEX.match(token) for token in tokens):
+            return True
+        
+        # Check multi-word keywords, last word may be extended ('--force' -> '--force-with-lease')
+        joined = f" {' '.join(tokens)} "
+        for phrase in SENSITIVE_COMMAND_PHRASES:
+            if f" {phrase}" in joined:
                 return True
         
         # Check if matches dangerous patterns
-        for pattern in DANGEROUS_PATTERNS:
-            if re.search(pattern, command_lower):
-                return True
+        if DANGEROUS_REGEX.search(command_lower):
+            return True
         
         return False
     
@@ -68,6 +170,94 @@ class CommandExecutor:
                 )
             )
     
+    @staticmethod
+    def command_exists(name: str) -> bool:
+        """
+        Check if a command head can be run (shell builtin or program on PATH)
+        
+        Args:
+            name: First word of the command
+            
+        Returns:
+            False only if the command is certainly not available
+        """
+        if not name or name in SHELL_BUILTINS or '=' in name or SHELL_METACHARACTERS.search(name):
+            return True
+        return shutil.which(name) is not None
+    
+    def _build_argv(self, command: str) -> Optional[List[str]]:
+        """
+        Split command into an argument list if it can run without a shell
+        
+        Args:
+            command: Command string
+            
+        Returns:
+            Argument list, or None if the command needs a shell
+        """
+        if SHELL_METACHARACTERS.search(command):
+            return None
+        try:
+            argv = shlex.split(command)
+        except ValueError:
+            return None
+        # Environment assignments and shell builtins (cd, export ...) need a shell
+        if not argv or '=' in argv[0] or shutil.which(argv[0]) is None:
+            return None
+        return argv
+    
+    @staticmethod
+    def _foreground_tty() -> Optional[int]:
+        """Return the terminal file descriptor if this process is in its foreground, else None"""
+        try:
+            fd = sys.stdin.fileno()
+            if os.isatty(fd) and os.tcgetpgrp(fd) == os.getpgrp():
+                return fd
+        except (AttributeError, ValueError, OSError):
+            pass
+        return None
+    
+    @staticmethod
+    def _set_foreground(tty_fd: int, pgid: int):
+        """Make a process group the terminal foreground (SIGTTOU blocked, the caller may be in the background)"""
+        old_mask = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTTOU})
+        try:
+            os.tcsetpgrp(tty_fd, pgid)
+        except OSError:
+            pass  # Group already gone
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
+    
+    @staticmethod
+    def _kill_group(process: subprocess.Popen):
+        """Kill the command and every process it started (pipeline members, background jobs)"""
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    
+    def _stream_output(self, source: IO[str], sink: TextIO, tail: Deque[str], stop: threading.Event):
+        """
+        Copy process output to the terminal line by line, keeping only a bounded tail
+        
+        Args:
+            source: Process pipe to read
+            sink: Terminal stream to write (sys.stdout or sys.stderr)
+            tail: Receives the last OUTPUT_TAIL_LIMIT characters of output
+            stop: Set when execution is abandoned, no more output is written after that
+        """
+        size = 0
+        for line in source:
+            if stop.is_set():
+                break
+            sink.write(line)
+            sink.flush()
+            tail.append(line)
+            size += len(line)
+            while size > OUTPUT_TAIL_LIMIT and len(tail) > 1:
+                size -= len(tail.popleft())
+        source.close()
+    
     def execute_command(self, command: str, auto_approve: bool = False) -> Tuple[bool, str, str]:
         """
         Execute command
@@ -104,26 +294,92 @@ class CommandExecutor:
         try:
             # Execute command
             console.print(f"[dim]Executing...[/dim]")
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
+            sys.stdout.flush()
+            # Simple commands are executed directly, skipping the /bin/sh process
+            argv = self._build_argv(command)
+            
+            # The command gets its own process group, so a timeout can kill the whole
+            # pipeline; it becomes the terminal foreground, so Ctrl-C and sudo still reach it
+            tty_fd = self._foreground_tty()
+            
+            def start_process_group():
+                os.setpgid(0, 0)
+                if tty_fd is not None:
+                    self._set_foreground(tty_fd, os.getpgrp())
+            
+            process = subprocess.Popen(
+                argv if argv is not None else command,
+                shell=argv is None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=COMMAND_TIMEOUT,
+                errors="replace",
+                bufsize=1,
+                preexec_fn=start_process_group,
                 cwd=None  # Use current working directory
             )
+            try:
+                # Also set from the parent, so killpg() cannot race the child
+                os.setpgid(process.pid, process.pid)
+            except OSError:
+                pass  # Child already did it and may have exec'd
+            if tty_fd is not None:
+                self._set_foreground(tty_fd, process.pid)
+            previous_sigint = None
+            if tty_fd is None and threading.current_thread() is threading.main_thread():
+                # Without the terminal, Ctrl-C only reaches us: pass it on, then handle it as before
+                def forward_sigint(signum, frame):
+                    try:
+                        os.killpg(process.pid, signal.SIGINT)
+                    except ProcessLookupError:
+                        pass
+                    if callable(previous_sigint):
+                        previous_sigint(signum, frame)
+                
+                previous_sigint = signal.signal(signal.SIGINT, forward_sigint)
+            
+            # Stream stdout/stderr as they arrive instead of buffering everything
+            stdout_tail: Deque[str] = deque()
+            stderr_tail: Deque[str] = deque()
+            stop = threading.Event()
+            readers = [
+                threading.Thread(target=self._stream_output, args=(process.stdout, sys.stdout, stdout_tail, stop), daemon=True),
+                threading.Thread(target=self._stream_output, args=(process.stderr, sys.stderr, stderr_tail, stop), daemon=True),
+            ]
+            for reader in readers:
+                reader.start()
+            
+            deadline = time.monotonic() + COMMAND_TIMEOUT
+            try:
+                returncode = process.wait(timeout=COMMAND_TIMEOUT)
+                # Background children may still hold the pipes open
+                for reader in readers:
+                    reader.join(max(0, deadline - time.monotonic()))
+                if any(reader.is_alive() for reader in readers):
+                    raise subprocess.TimeoutExpired(command, COMMAND_TIMEOUT)
+            except BaseException:
+                # Timeout or Ctrl-C: do not leave the command or its children running
+                stop.set()
+                self._kill_group(process)
+                process.wait()
+                for reader in readers:
+                    reader.join(1)
+                raise
+            finally:
+                if tty_fd is not None:
+                    self._set_foreground(tty_fd, os.getpgrp())
+                if previous_sigint is not None:
+                    signal.signal(signal.SIGINT, previous_sigint)
+            
+            stdout, stderr = "".join(stdout_tail), "".join(stderr_tail)
             
             # Display results
-            if result.returncode == 0:
+            if returncode == 0:
                 console.print("[green]✓ Command executed successfully[/green]")
-                if result.stdout:
-                    console.print(f"[dim]Output:[/dim]\n{result.stdout}")
             else:
-                console.print(f"[red]✗ Command execution failed (exit code: {result.returncode})[/red]")
-                if result.stderr:
-                    console.print(f"[red]Error:[/red]\n{result.stderr}")
+                console.print(f"[red]✗ Command execution failed (exit code: {returncode})[/red]")
             
-            return result.returncode == 0, result.stdout, result.stderr
+            return returncode == 0, stdout, stderr
             
         except subprocess.TimeoutExpired:
             error_msg = f"Command execution timeout (exceeded {COMMAND_TIMEOUT} seconds)"
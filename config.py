@@ -2,7 +2,8 @@
 Configuration file: Define sensitive commands and system settings
 """
 import os
-from typing import List, Set
+import re
+from typing import List, Set, Tuple
 
 # Sensitive command keywords list (commands that require user approval)
 SENSITIVE_COMMAND_KEYWORDS: Set[str] = {
@@ -14,7 +15,7 @@ SENSITIVE_COMMAND_KEYWORDS: Set[str] = {
     'dd',  # Disk operations
     'format', 'mkfs',  # Format operations
     'shutdown', 'reboot', 'halt',  # System control
-    'kill', 'killall',  # Process termination
+    'kill', 'killall', 'pkill',  # Process termination
     'curl', 'wget',  # Network downloads (may download malicious files)
     'git push --force',  # Force push
     'drop', 'truncate',  # Database dangerous operations
@@ -30,26 +31,94 @@ DANGEROUS_PATTERNS: List[str] = [
     r'sudo\s+rm',  # Sudo delete
 ]
 
+# Keywords matched against command tokens: single words via set intersection,
+# multi-word keywords (e.g. 'git push --force') as token phrases
+SENSITIVE_COMMAND_WORDS: Set[str] = {k for k in SENSITIVE_COMMAND_KEYWORDS if ' ' not in k}
+SENSITIVE_COMMAND_PHRASES: List[str] = [k for k in SENSITIVE_COMMAND_KEYWORDS if ' ' in k]
+
+# Command families matched by token prefix (e.g. 'mkfs.ext4', 'mkfs.vfat')
+SENSITIVE_COMMAND_PREFIXES: Tuple[str, ...] = ('mkfs.',)
+
+# Shell operator token that redirects output ('>', '>>', '&>', '>|', '>&' ...)
+REDIRECTION_OPERATOR_REGEX = re.compile(r'^[0-9&]*>[>|&]?[0-9-]*$')
+
+# Compiled once at import: all patterns fused into a single alternation,
+# so a command is scanned in one pass instead of once per pattern
+DANGEROUS_REGEX = re.compile("|".join(f"(?:{p})" for p in DANGEROUS_PATTERNS))
+
 # AI API Configuration
-# API provider type: 'openai', 'custom'
+# API provider type: 'openai', 'anthropic', 'custom'
 AI_API_PROVIDER = os.getenv('AI_API_PROVIDER', 'openai')
 
 # API endpoint URL (set this value if using custom API)
 # Example: 'https://api.openai.com/v1/chat/completions' or 'http://localhost:8000/v1/chat/completions'
-AI_API_URL = os.getenv('AI_API_URL', 'https://ark.cn-beijing.volces.com/api/v3/chat/completions')
+# Several endpoints can be given comma-separated, they are used round-robin
+AI_API_URLS: List[str] = [
+    url.strip()
+    for url in os.getenv('AI_API_URL', 'https://ark.cn-beijing.volces.com/api/v3/chat/completions').split(',')
+    if url.strip()
+] or ['https://ark.cn-beijing.volces.com/api/v3/chat/completions']
+AI_API_URL = AI_API_URLS[0]
 
-# API key
-AI_API_KEY = os.getenv('AI_API_KEY', '')
+# API key (several keys can be given comma-separated, they are used round-robin)
+AI_API_KEYS: List[str] = [key.strip() for key in os.getenv('AI_API_KEY', '').split(',') if key.strip()]
+AI_API_KEY = AI_API_KEYS[0] if AI_API_KEYS else ''
 
 # AI model name (adjust according to API provider)
 AI_MODEL = os.getenv('AI_MODEL', 'doubao-seed-1-6-251015')
 
+# Whether the API accepts gzip-compressed request bodies (Content-Encoding: gzip)
+SUPPORTS_GZIP = os.getenv('SUPPORTS_GZIP', 'false').lower() == 'true'
+
+# Only compress request bodies larger than this (bytes)
+GZIP_MIN_SIZE = 1024
+
+# Stream API responses (server-sent events) so answers are shown as they are generated
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'true').lower() == 'true'
+
+# Open the connection to the API at startup, so the first request skips the TLS handshake
+PREWARM_CONNECTION = os.getenv('PREWARM_CONNECTION', 'true').lower() == 'true'
+
 # API request timeout (seconds)
 API_TIMEOUT = int(os.getenv('API_TIMEOUT', '90'))
 
+# Conversation window sent to the API: once it grows past MAX messages it is
+# cut back to MIN in one step, so the request prefix stays identical for several
+# turns and provider-side prompt caching keeps hitting
+HISTORY_WINDOW_MAX = 20
+HISTORY_WINDOW_MIN = 10
+
+# Maximum tokens of conversation history sent per request (newest messages kept)
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '1500'))
+
+# Response cache configuration (identical requests reuse the previous answer)
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+CACHE_DIR = os.getenv('CACHE_DIR', '~/.simplecmd/cache')
+CACHE_TTL = int(os.getenv('CACHE_TTL', '3600'))
+CACHE_SIZE_LIMIT = 100 * 1024 * 1024  # 100 MB
+
+# Semantic cache: also reuse answers for paraphrased requests
+# (optional, requires sentence-transformers and faiss-cpu)
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+SEMANTIC_CACHE_MODEL = os.getenv('SEMANTIC_CACHE_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))
+
+# Requests whose answer depends on when they are asked, never served from semantic cache
+SEMANTIC_CACHE_EXCLUDE_PATTERNS: List[str] = [
+    r'\b(date|time|uptime|now|today|yesterday|tomorrow)\b',
+    r'\b(latest|newest|recent)\b',
+]
+
 # Command execution timeout (seconds)
 COMMAND_TIMEOUT = 90
 
+# Command output is streamed to the terminal; only this many trailing characters
+# of stdout/stderr are kept in memory and returned to the caller
+OUTPUT_TAIL_LIMIT = 64 * 1024
+
+# Number of prompts processed concurrently per API endpoint in batch mode (main.py --batch)
+BATCH_CONCURRENCY = int(os.getenv('SIMPLECMD_CONCURRENCY', '8'))
+
 # Whether to run in debug mode (show more debug information)
 DEBUG_MODE = os.getenv('DEBUG', 'false').lower() == 'true'
 
@@ -0,0 +1,69 @@
+"""
+Intent Router Module: Answer well-known trivial requests locally, without calling the AI API
+"""
+import re
+import string
+from typing import Dict, Optional
+
+# Normalized user request -> command
+TRIVIAL_COMMANDS: Dict[str, str] = {
+    # Directory listing
+    'ls': 'ls -la',
+    'list files': 'ls -la',
+    'list all files': 'ls -la',
+    'show files': 'ls -la',
+    'show all files': 'ls -la',
+    'list files in current directory': 'ls -la',
+    'list all files in current directory': 'ls -la',
+    'list files in current dir': 'ls -la',
+    # Working directory
+    'pwd': 'pwd',
+    'current directory': 'pwd',
+    'show current directory': 'pwd',
+    'print current directory': 'pwd',
+    'print working directory': 'pwd',
+    'print working dir': 'pwd',
+    'where am i': 'pwd',
+    # User and host
+    'whoami': 'whoami',
+    'who am i': 'whoami',
+    'show current user': 'whoami',
+    'hostname': 'hostname',
+    'show hostname': 'hostname',
+    # System status
+    'date': 'date',
+    'show date': 'date',
+    'show time': 'date',
+    'what time is it': 'date',
+    'uptime': 'uptime',
+    'show uptime': 'uptime',
+    'disk usage': 'df -h',
+    'show disk usage': 'df -h',
+    'memory usage': 'free -h',
+    'show memory usage': 'free -h',
+    'list processes': 'ps aux',
+    'show processes': 'ps aux',
+    'show environment variables': 'env',
+}
+
+_PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = text.lower().translate(_PUNCTUATION_TABLE)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def route(user_input: str) -> Optional[str]:
+    """
+    Look up a command for a trivial request
+    
+    Args:
+        user_input: User's natural language input
+        
+    Returns:
+        Command string, or None if the request needs the AI
+    """
+    return TRIVIAL_COMMANDS.get(normalize(user_input))
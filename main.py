@@ -4,23 +4,22 @@ Command-line AI Agent Main Program
 """
 import sys
 import os
+import asyncio
+import argparse
+from typing import TYPE_CHECKING, List, Optional, Tuple
 from rich.console import Console
 from rich.panel import Panel
-from rich.markdown import Markdown
-from dotenv import load_dotenv
-from prompt_toolkit import prompt as pt_prompt
-from prompt_toolkit.shortcuts import confirm
-from prompt_toolkit.styles import Style
-from ai_agent import AIAgent
-from command_executor import CommandExecutor
 
-# Load environment variables
-load_dotenv()
+# Heavier modules are imported where they are used, so startup only pays for what runs
+if TYPE_CHECKING:
+    from rich.live import Live
+    from ai_agent import AIAgent
+    from command_executor import CommandExecutor
 
 console = Console()
 
 
-def get_user_input(prompt_text: str = "") -> str:
+async def get_user_input(prompt_text: str = "") -> str:
     """
     Get user input with cursor movement support using prompt_toolkit
     
@@ -30,9 +29,12 @@ def get_user_input(prompt_text: str = "") -> str:
     Returns:
         User input string
     """
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.styles import Style
+    
     try:
         # Use prompt_toolkit for input with full cursor support
-        user_input = pt_prompt(
+        user_input = await PromptSession().prompt_async(
             prompt_text,
             style=Style.from_dict({
                 'prompt': 'bold cyan',
@@ -43,7 +45,7 @@ def get_user_input(prompt_text: str = "") -> str:
         return ""
 
 
-def get_confirmation(prompt_text: str, default: bool = False) -> bool:
+async def get_confirmation(prompt_text: str, default: bool = False) -> bool:
     """
     Get user confirmation with cursor movement support.
     Note: default is kept for API compatibility; prompt_toolkit confirm has no default param.
@@ -55,15 +57,100 @@ def get_confirmation(prompt_text: str, default: bool = False) -> bool:
     Returns:
         True if user confirms, False otherwise
     """
+    from prompt_toolkit.shortcuts import create_confirm_session
+    
     try:
-        # prompt_toolkit confirm() only accepts message and suffix, no default param
-        return confirm(message=prompt_text, suffix="")
+        # prompt_toolkit confirm session only accepts message and suffix, no default param
+        return await create_confirm_session(message=prompt_text, suffix="").prompt_async()
     except (KeyboardInterrupt, EOFError):
         return False
 
 
+# Marker the AI puts before answers to questions
+QUESTION_PREFIX = "QUESTION:"
+QUESTION_PREFIX_LEN = len(QUESTION_PREFIX)
+
+# Response prefixes that are not plain commands
+SPECIAL_PREFIXES = (QUESTION_PREFIX, "NEEDS_APPROVAL:", "UNKNOWN", "Error:")
+
+
+class AnswerStreamer:
+    """
+    Handle the AI response while it is streamed: render QUESTION answers live, and
+    look up the command head as soon as it is known, overlapping it with generation
+    """
+    
+    def __init__(self, executor: "CommandExecutor"):
+        self._executor = executor
+        self._buffer = ""
+        self._live: Optional["Live"] = None
+        self._command_head: Optional[str] = None
+        self._command_lookup: Optional[asyncio.Task] = None
+    
+    def _panel(self) -> Panel:
+        answer = self._buffer.lstrip()[QUESTION_PREFIX_LEN:].strip()
+        return Panel(answer, title="[bold green]Answer[/bold green]", border_style="green")
+    
+    def _start_command_lookup(self):
+        """Start looking up the command head once the response is known to be a plain command"""
+        text = self._buffer.lstrip()
+        # Still undecided, or not a plain command
+        if any(text.startswith(p) or p.startswith(text) for p in SPECIAL_PREFIXES):
+            return
+        # Wait until the first word is complete (followed by whitespace) or 20 characters arrived
+        if len(text) < 20 and not any(c.isspace() for c in text):
+            return
+        self._command_head = text.split(None, 1)[0]
+        self._command_lookup = asyncio.create_task(
+            asyncio.to_thread(self._executor.command_exists, self._command_head)
+        )
+    
+    async def missing_command(self, command: str) -> Optional[str]:
+        """
+        Get the command head if it is not available, reusing the lookup started while streaming
+        
+        Args:
+            command: Complete command
+            
+        Returns:
+            Missing command name, None if the command can be run
+        """
+        words = command.split(None, 1)
+        head = words[0] if words else ""
+        if self._command_lookup is not None and self._command_head == head:
+            exists = await self._command_lookup
+        else:
+            exists = self._executor.command_exists(head)
+        return None if exists else head
+    
+    def __call__(self, chunk: str):
+        self._buffer += chunk
+        if self._command_lookup is None:
+            self._start_command_lookup()
+        if self._live is None:
+            # Commands are only shown once complete (approval marker must be checked first)
+            if not self._buffer.lstrip().startswith(QUESTION_PREFIX):
+                return
+            from rich.live import Live
+            self._live = Live(self._panel(), console=console, refresh_per_second=8)
+            self._live.start()
+        else:
+            self._live.update(self._panel())
+    
+    def finish(self) -> bool:
+        """Stop live rendering, return True if an answer was displayed"""
+        if self._live is None:
+            return False
+        self._live.update(self._panel(), refresh=True)
+        self._live.stop()
+        self._live = None
+        return True
+
+
 def print_welcome():
     """Display welcome message"""
+    from rich.markdown import Markdown
+    
     welcome_text = """
 # Command-line AI Agent
 
@@ -90,6 +177,8 @@ Welcome to the Command-line AI Agent! You can chat with me in natural language,
 
 def print_help():
     """Display help information"""
+    from rich.markdown import Markdown
+    
     help_text = """
 **Available Commands:**
 
@@ -108,8 +197,50 @@ def print_help():
     console.print(Panel(Markdown(help_text), title="[bold green]Help[/bold green]", border_style="green"))
 
 
-def main():
+async def run_batch(ai_agent: "AIAgent", prompts: List[str]):
+    """
+    Process prompts concurrently and print generated commands/answers, tagged by line number.
+    Commands are only printed, never executed.
+    
+    Args:
+        ai_agent: AI agent
+        prompts: User requests, one per line
+    """
+    # The agent also bounds concurrency per endpoint
+    from config import BATCH_CONCURRENCY
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY * ai_agent.endpoint_count)
+    
+    async def bounded(prompt: str) -> Tuple[str, bool]:
+        async with semaphore:
+            # Prompts are independent, do not share conversation history
+            return await ai_agent.achat(prompt, use_history=False)
+    
+    results = await asyncio.gather(*(bounded(prompt) for prompt in prompts))
+    for i, (ai_response, needs_approval) in enumerate(results, 1):
+        prefix = "NEEDS_APPROVAL: " if needs_approval else ""
+        print(f"{i}\t{prefix}{ai_response}")
+
+
+async def amain(batch: bool = False):
     """Main function"""
+    from ai_agent import AIAgent
+    from command_executor import CommandExecutor
+    
+    if batch:
+        # stdout carries only result lines, warnings and errors go to stderr
+        from ai_agent import console as agent_console
+        console.file = sys.stderr
+        agent_console.file = sys.stderr
+        
+        prompts = [line.strip() for line in sys.stdin if line.strip()]
+        ai_agent = AIAgent()
+        try:
+            await run_batch(ai_agent, prompts)
+        finally:
+            await ai_agent.aclose()
+        return
+    
     print_welcome()
     
     # Initialize AI agent and command executor
@@ -126,12 +257,22 @@ def main():
         )
         console.print("[dim]Continuing (some features may be unavailable)...[/dim]\n")
     
-    # Main loop
+    # Connect to the API while the user types the first request
+    prewarm = asyncio.create_task(ai_agent.aprewarm())
+    try:
+        await repl(ai_agent, executor)
+    finally:
+        prewarm.cancel()
+        await ai_agent.aclose()
+
+
+async def repl(ai_agent: "AIAgent", executor: "CommandExecutor"):
+    """Interactive read-eval loop"""
     while True:
         try:
             # Get user input with cursor support
             console.print("\n[bold cyan]You[/bold cyan]", end="")
-            user_input = get_user_input(": ")
+            user_input = await get_user_input(": ")
             
             if not user_input:
                 continue
@@ -162,12 +303,17 @@ def main():
             
             # Process natural language input
             console.print(f"[dim]Thinking...[/dim]")
-            ai_response, needs_approval = ai_agent.chat(user_input)
+            streamer = AnswerStreamer(executor)
+            try:
+                ai_response, needs_approval = await ai_agent.achat(user_input, on_chunk=streamer)
+            finally:
+                answer_shown = streamer.finish()
             
             # Check if it's a question answer
-            if ai_response.startswith("QUESTION:"):
-                answer = ai_response.replace("QUESTION:", "").strip()
-                console.print(Panel(answer, title="[bold green]Answer[/bold green]", border_style="green"))
+            if ai_response.startswith(QUESTION_PREFIX):
+                if not answer_shown:
+                    answer = ai_response[QUESTION_PREFIX_LEN:].lstrip()
+                    console.print(Panel(answer, title="[bold green]Answer[/bold green]", border_style="green"))
                 continue
             
             # Check if it's an unknown request
@@ -183,11 +329,17 @@ def main():
             # Display AI-generated command
             console.print(f"\n[bold]AI Suggested Command:[/bold] [cyan]{ai_response}[/cyan]")
             
+            # Lookup normally already ran while the response was streaming; only a hint,
+            # the shell still runs the command and reports if it is really missing
+            missing = await streamer.missing_command(ai_response)
+            if missing:
+                console.print(f"[yellow]Note: '{missing}' was not found on PATH[/yellow]")
+            
             # Determine if approval is needed based on API
             if needs_approval:
                 # Command requires approval, ask user
                 console.print("\n[red bold]⚠️  This is a dangerous command, continue execution?[/red bold]")
-                should_execute = get_confirmation("(y/n): ", default=False)
+                should_execute = await get_confirmation("(y/n): ", default=False)
                 
                 if should_execute:
                     # Execute command
@@ -212,6 +364,27 @@ def main():
                 console.print(traceback.format_exc())
 
 
+def main():
+    """Entry point"""
+    parser = argparse.ArgumentParser(description="Command-line AI Agent")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="read requests from stdin, one per line, and print the generated commands"
+    )
+    args = parser.parse_args()
+    
+    # Load environment variables (before config is imported)
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    try:
+        asyncio.run(amain(batch=args.batch))
+    except KeyboardInterrupt:
+        # Interrupt while awaiting the API cancels the event loop
+        console.print("\n[yellow]\nProgram interrupted, goodbye![/yellow]")
+
+
 if __name__ == "__main__":
     main()
 